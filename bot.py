@@ -5,6 +5,8 @@ import threading
 import random
 import json
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime, timezone
 from flask import Flask
 from dotenv import load_dotenv
@@ -18,29 +20,67 @@ load_dotenv()
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 POST_INTERVAL_HOURS = float(os.getenv("POST_INTERVAL_HOURS", "24"))
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 3600
 
 GAMMA_API = "https://gamma-api.polymarket.com/events"
+GAMMA_POOL_PARAMS = {"limit": 100, "active": "true", "closed": "false", "order": "volume", "ascending": "false"}
+POOL_CACHE_TTL = 900  # seconds; retries after a failed post reuse the same pool
+POOL_STALE_TTL = 3600  # seconds; how long a cached pool may stand in when Gamma is down
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 logger = logging.getLogger("polybot")
 
-posted_history = []
+# One keep-alive pool for Gamma and Telegram instead of a fresh TLS handshake per call;
+# transient gateway errors are retried here rather than costing a full loop backoff
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4, pool_maxsize=16,
+    max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[502, 503, 504]),
+))
+_SESSION.headers.update({"User-Agent": "polybot/1"})
+
+def _f(v, d=0.0):
+    try: return float(v)
+    except (TypeError, ValueError): return d
+
+posted_history = set()
+_pool_cache = {"ts": 0.0, "events": None, "etag": None}
+
+_POST_HEADER = "🏆 <b>POLYMARKET: DAILY TOP PICK</b> 🏆\n"
+_POST_FOOTER = "━━━━━━━━━━━━━━━━━━━━\n💎 <b>Shared via @polymsignals</b>"
 
 class FinalSignalEngine:
     def fetch_pool(self):
+        now = time.monotonic()
+        if _pool_cache["events"] and now - _pool_cache["ts"] < POOL_CACHE_TTL:
+            return _pool_cache["events"]
+        # Revalidate with If-None-Match so an unchanged pool costs a 304 and no JSON decode
+        headers = {"If-None-Match": _pool_cache["etag"]} if _pool_cache["events"] and _pool_cache["etag"] else {}
         try:
-            params = {"limit": 100, "active": "true", "closed": "false", "order": "volume", "ascending": "false"}
-            resp = requests.get(GAMMA_API, params=params, timeout=15)
-            return resp.json() if resp.status_code == 200 else []
-        except: return []
+            resp = _SESSION.get(GAMMA_API, params=GAMMA_POOL_PARAMS, headers=headers, timeout=15)
+            if resp.status_code == 304:
+                _pool_cache["ts"] = now
+                return _pool_cache["events"]
+            events = resp.json() if resp.status_code == 200 else []
+        except: events = []
+        if events:
+            _pool_cache["ts"], _pool_cache["events"] = now, events
+            _pool_cache["etag"] = resp.headers.get("ETag")
+            return events
+        if _pool_cache["events"] and now - _pool_cache["ts"] < POOL_STALE_TTL:
+            logger.warning("Gamma fetch failed, using cached event pool")
+            return _pool_cache["events"]
+        return []
 
     def get_tip(self, events):
-        global posted_history
         if not events: return None
-        
+
+        # Forget slugs that have left the pool so the history stays bounded by the pool size
+        posted_history.intersection_update(e.get("slug") for e in events)
         available = [e for e in events if e.get("slug") not in posted_history]
         if not available:
-            posted_history = []
+            posted_history.clear()
             available = events
 
         selected_event = random.choice(available)
@@ -48,29 +88,25 @@ class FinalSignalEngine:
         markets = selected_event.get("markets", [])
         if not markets: return None
 
-        # Sort by highest probability to pick the "safest" signal (The Favorite)
-        try:
-            def get_top_price(m):
-                p_raw = m.get("outcomePrices", "[0.5, 0.5]")
+        # Single scan for the highest probability to pick the "safest" signal (The Favorite)
+        best_price, m = -1.0, None
+        for mk in markets:
+            try:
+                p_raw = mk.get("outcomePrices", "[0.5, 0.5]")
                 p = json.loads(p_raw) if isinstance(p_raw, str) else p_raw
-                return max(float(p[0]), float(p[1]))
-            markets.sort(key=get_top_price, reverse=True)
-        except: pass
-
-        m = markets[0]
+                yes, no = float(p[0]), float(p[1])
+            except: continue
+            top = yes if yes >= no else no
+            if top > best_price:
+                best_price, m, price_yes, price_no = top, mk, yes, no
+        if m is None: return None
         
         try:
-            prices_raw = m.get("outcomePrices", [0.5, 0.5])
-            prices = json.loads(prices_raw) if isinstance(prices_raw, str) else prices_raw
-            
             outcomes_raw = m.get("outcomes", ["Yes", "No"])
             outcomes = json.loads(outcomes_raw) if isinstance(outcomes_raw, str) else outcomes_raw
 
             # Logic to decide if we recommend YES or NO based on higher probability
             # Usually signals follow the highest probability (The "Winner")
-            price_yes = float(prices[0])
-            price_no = float(prices[1])
-            
             if price_yes >= price_no:
                 chosen_side = "YES"
                 chosen_prob = price_yes
@@ -95,7 +131,7 @@ class FinalSignalEngine:
                 "out": position_display,
                 "prob": chosen_prob * 100,
                 "roi": roi,
-                "vol": float(selected_event.get("volume", 0) or 0),
+                "vol": _f(selected_event.get("volume")),
                 "slug": selected_event.get("slug")
             }
         except Exception as e:
@@ -103,19 +139,18 @@ class FinalSignalEngine:
             return None
 
     def format_post(self, tip):
-        now = datetime.now(timezone.utc).strftime("%B %d, %Y")
-        msg = f"🏆 <b>POLYMARKET: DAILY TOP PICK</b> 🏆\n"
-        msg += f"📅 <i>{now}</i>\n"
-        msg += "━━━━━━━━━━━━━━━━━━━━\n\n"
-        msg += f"🎯 <b>MARKET:</b>\n{tip['q']}\n\n"
-        msg += f"✅ <b>POSITION:</b> {tip['out']}\n"
-        msg += f"📈 <b>PROBABILITY:</b> {tip['prob']:.1f}%\n"
-        msg += f"💰 <b>POTENTIAL ROI:</b> +{tip['roi']:.1f}%\n\n"
-        msg += f"📊 <b>STATS:</b> Vol ${tip['vol']:,.0f}\n\n"
-        msg += f"🔗 <a href='https://polymarket.com/event/{tip['slug']}'>Trade on Polymarket</a>\n"
-        msg += "━━━━━━━━━━━━━━━━━━━━\n"
-        msg += "💎 <b>Shared via @polymsignals</b>"
-        return msg
+        return (
+            f"{_POST_HEADER}"
+            f"📅 <i>{datetime.now(timezone.utc):%B %d, %Y}</i>\n"
+            "━━━━━━━━━━━━━━━━━━━━\n\n"
+            f"🎯 <b>MARKET:</b>\n{tip['q']}\n\n"
+            f"✅ <b>POSITION:</b> {tip['out']}\n"
+            f"📈 <b>PROBABILITY:</b> {tip['prob']:.1f}%\n"
+            f"💰 <b>POTENTIAL ROI:</b> +{tip['roi']:.1f}%\n\n"
+            f"📊 <b>STATS:</b> Vol ${tip['vol']:,.0f}\n\n"
+            f"🔗 <a href='https://polymarket.com/event/{tip['slug']}'>Trade on Polymarket</a>\n"
+            f"{_POST_FOOTER}"
+        )
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # EXECUTION
@@ -127,6 +162,7 @@ def health(): return "LIVE", 200
 
 def bot_main_loop():
     engine = FinalSignalEngine()
+    failures = 0
     time.sleep(10)
     while True:
         try:
@@ -135,11 +171,24 @@ def bot_main_loop():
             if tip:
                 url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
                 payload = {"chat_id": TELEGRAM_CHAT_ID, "text": engine.format_post(tip), "parse_mode": "HTML", "disable_web_page_preview": True}
-                if requests.post(url, json=payload).status_code == 200:
+                resp = _SESSION.post(url, json=payload, timeout=15)
+                if resp.status_code == 200:
+                    posted_history.add(tip["slug"])
+                    failures = 0
                     time.sleep(POST_INTERVAL_HOURS * 3600)
-                else: time.sleep(300)
-            else: time.sleep(300)
-        except: time.sleep(300)
+                    continue
+                if resp.status_code == 429:
+                    # Flood control: Telegram says exactly how long to wait, so honour that instead of backing off
+                    retry_after = resp.json().get("parameters", {}).get("retry_after", RETRY_BASE_SECONDS)
+                    logger.warning(f"Telegram rate limited, retrying in {retry_after}s")
+                    time.sleep(retry_after)
+                    continue
+                logger.warning(f"Telegram send failed: HTTP {resp.status_code}")
+        except Exception as e:
+            logger.error(f"Error: {e}")
+        # Quick first retry, then exponential backoff while failures persist
+        time.sleep(min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** failures))
+        failures += 1
 
 if __name__ == "__main__":
     threading.Thread(target=bot_main_loop, daemon=True).start()